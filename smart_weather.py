@@ -1,10 +1,24 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import sqlite3
+import os
+import tempfile
+import threading
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+try:
+    import adbc_driver_sqlite
+    import adbc_driver_sqlite.dbapi as adbc_sqlite
+except ImportError:  # Optional: fall back to pandas' DB-API reader
+    adbc_sqlite = None
 
 # Page configuration
 st.set_page_config(
@@ -19,108 +33,496 @@ DB_METEOSTAT = BASE_PATH / "meteostat_data.db"
 DB_FORECAST = BASE_PATH / "forecast_data.db"
 DB_CURRENT = BASE_PATH / "current_data.db"
 
+# Columnar copy of the meteostat table, refreshed from DB_METEOSTAT
+PARQUET_METEOSTAT = BASE_PATH / "meteostat.parquet"
+METEOSTAT_COLUMNS = ['date', 'city', 'temperature', 'precipitation', 'humidity', 'wind_speed']
+
+# Weather readings need nowhere near float64 precision; float32 halves their
+# memory. humidity stays float because meteostat has NULL humidity rows.
+METEOSTAT_DTYPES = {
+    'temperature': 'float32',
+    'precipitation': 'float32',
+    'humidity': 'float32',
+    'wind_speed': 'float32'
+}
+FORECAST_DTYPES = {
+    'temp_c': 'float32',
+    'humidity': 'float32',
+    'precip_mm': 'float32'
+}
+
+# Display names for the historical statistics summary table (Tab 4)
+SUMMARY_COLUMNS = {
+    'avg_temp': 'Avg Temperature (°C)',
+    'max_temp': 'Max Temperature (°C)',
+    'min_temp': 'Min Temperature (°C)',
+    'total_precip': 'Total Precipitation (mm)',
+    'avg_humidity': 'Avg Humidity (%)',
+    'avg_wind': 'Avg Wind Speed (km/h)'
+}
+
+# Radar chart axes: current-weather column and the factor putting it on a 0-100 scale
+RADAR_CATEGORIES = ['Temperature', 'Humidity', 'Wind Speed', 'Precipitation', 'AQI']
+RADAR_COLUMNS = ['temp_c', 'humidity', 'wind_kph', 'precip_mm', 'aqi']
+RADAR_SCALE = np.array([2, 1, 2, 10, 1])
+
 # Database loading functions
-@st.cache_data(ttl=3600)
-def get_available_cities():
-    """Dynamically fetch list of cities from databases"""
-    cities = set()
-    
-    # Try to get cities from current weather database
+# Attach alias, database and table that get_available_cities reads cities from
+CITY_SOURCES = [
+    ('cur', DB_CURRENT, 'current'),
+    ('fc', DB_FORECAST, 'forecast'),
+    ('ms', DB_METEOSTAT, 'meteostat')
+]
+
+# Cached results are keyed on database mtimes rather than expiring on a TTL;
+# the bound drops entries left behind by older versions of the databases
+CACHE_MAX_ENTRIES = 64
+
+# Read-side tuning: 256MB memory-mapped I/O, 64MB page cache, in-memory temp tables
+READ_PRAGMAS = """
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-65536;
+PRAGMA temp_store=MEMORY;
+"""
+
+def database_uri(db_path):
+    """Return a read-only SQLite URI for a database file"""
+    return f"{Path(db_path).resolve().as_uri()}?mode=ro"
+
+def connect_readonly(db_path):
+    """Open a read-only, mmap-enabled connection to a dashboard database"""
+    conn = sqlite3.connect(database_uri(db_path), uri=True)
+    conn.executescript(READ_PRAGMAS)
+    return conn
+
+# ADBC infers each column's type from the first batch; one batch per query
+# keeps a leading run of NULLs from fixing a REAL column as INT64
+ADBC_BATCH_ROWS = "1000000"
+
+def read_sql_adbc(db_path, query, params=None):
+    """Run a query through ADBC, which reads straight into Arrow columns"""
+    conn = adbc_sqlite.connect(database_uri(db_path))
     try:
-        conn = sqlite3.connect(DB_CURRENT)
-        query = "SELECT DISTINCT city FROM current"
-        df = pd.read_sql_query(query, conn)
+        cursor = conn.cursor()
+        cursor.adbc_statement.set_options(
+            **{adbc_driver_sqlite.StatementOptions.BATCH_ROWS.value: ADBC_BATCH_ROWS}
+        )
+        cursor.execute(query, params)
+        return cursor.fetch_arrow_table().to_pandas()
+    finally:
         conn.close()
-        cities.update(df['city'].tolist())
-    except Exception as e:
-        st.warning(f"Could not load cities from current database: {e}")
+
+def read_sql(db_path, query, params=None, parse_dates=None):
+    """Run a query against a SQLite database and return a DataFrame
+
+    Uses ADBC when installed, parsing parse_dates columns afterwards, and
+    falls back to pandas.read_sql_query on a read-only connection otherwise
+    or when ADBC cannot type a column (e.g. mixed storage classes).
+    """
+    if adbc_sqlite is not None:
+        try:
+            df = read_sql_adbc(db_path, query, params)
+        except adbc_sqlite.Error:
+            pass
+        else:
+            if isinstance(parse_dates, dict):
+                for col, kwargs in parse_dates.items():
+                    df[col] = pd.to_datetime(df[col], **kwargs)
+            else:
+                for col in parse_dates or []:
+                    df[col] = pd.to_datetime(df[col])
+            return df
     
-    # Try to get cities from forecast database
+    conn = connect_readonly(db_path)
     try:
-        conn = sqlite3.connect(DB_FORECAST)
-        query = "SELECT DISTINCT city FROM forecast"
-        df = pd.read_sql_query(query, conn)
+        return pd.read_sql_query(query, conn, params=params, parse_dates=parse_dates)
+    finally:
         conn.close()
-        cities.update(df['city'].tolist())
-    except Exception as e:
-        st.warning(f"Could not load cities from forecast database: {e}")
-    
-    # Try to get cities from meteostat database
+
+def database_mtime(db_path):
+    """Return the last-modified time of a database, including its WAL file
+
+    Used as a cache key so cached results stay valid until Airflow actually
+    writes to the database; 0.0 if the database does not exist yet.
+    """
+    mtimes = [0.0]
+    for path in (Path(db_path), Path(f"{db_path}-wal")):
+        try:
+            mtimes.append(path.stat().st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes)
+
+def city_placeholders(cities):
+    """Return the "?, ?" placeholder list for a city IN (...) clause"""
+    return ", ".join("?" * len(cities))
+
+# Lookup indexes the dashboard queries rely on
+INDEXES = [
+    (DB_CURRENT, "CREATE INDEX IF NOT EXISTS idx_current_city_time ON current(city, created_at DESC)"),
+    (DB_FORECAST, "CREATE INDEX IF NOT EXISTS idx_forecast_city_time ON forecast(city, datetime)"),
+    (DB_METEOSTAT, "CREATE INDEX IF NOT EXISTS idx_meteostat_city_date ON meteostat(city, date)"),
+]
+
+@st.cache_resource
+def ensure_index(db_path, statement):
+    """Switch a database to WAL journaling and create one index (once per process)
+
+    Raises on failure so Streamlit does not cache it and the next run retries.
+    """
+    conn = sqlite3.connect(db_path)
     try:
-        conn = sqlite3.connect(DB_METEOSTAT)
-        query = "SELECT DISTINCT city FROM meteostat"
-        df = pd.read_sql_query(query, conn)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(statement)
+        conn.commit()
+    finally:
         conn.close()
-        cities.update(df['city'].tolist())
-    except Exception as e:
-        st.warning(f"Could not load cities from meteostat database: {e}")
-    
-    return sorted(list(cities)) if cities else ["Nairobi", "Sydney", "New York", "London"]
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_current_weather():
-    """Load current weather data from database"""
+
+def ensure_indexes():
+    """Create every index in INDEXES, warning about any that fail"""
+    for db_path, statement in INDEXES:
+        try:
+            ensure_index(db_path, statement)
+        except Exception as e:
+            st.warning(f"Could not create index on {db_path}: {e}")
+
+def read_cities():
+    """Return the sorted cities across all readable databases and any problems
+
+    One in-memory connection has every readable database attached, so a
+    single UNION (which already de-duplicates) covers all sources.
+    """
+    cities = []
+    problems = []
+    conn = sqlite3.connect(":memory:", uri=True)
     try:
-        conn = sqlite3.connect(DB_CURRENT)
-        query = """
-        SELECT city, datetime, temp_c, humidity, wind_kph, wind_dir, 
-               precip_mm, aqi, condition, created_at
-        FROM current
-        ORDER BY created_at DESC
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        selects = []
+        for alias, db_path, table in CITY_SOURCES:
+            try:
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (database_uri(db_path),))
+                has_table = conn.execute(
+                    f"SELECT 1 FROM {alias}.sqlite_master WHERE type = 'table' AND name = ?",
+                    (table,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                problems.append(f"Could not load cities from {table} database: {e}")
+                continue
+            if has_table:
+                selects.append(f"SELECT city FROM {alias}.{table}")
+            else:
+                problems.append(f"Could not load cities from {table} database: no such table: {table}")
         
-        # Get most recent record for each city
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        df = df.sort_values('created_at').groupby('city').tail(1)
-        return df
+        if selects:
+            df = pd.read_sql_query(" UNION ".join(selects), conn)
+            cities = sorted(df['city'].dropna())
     except Exception as e:
-        st.error(f"Error loading current weather: {e}")
-        return pd.DataFrame()
+        problems.append(f"Could not load cities from databases: {e}")
+    finally:
+        conn.close()
+    return cities, problems
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_cities(mtimes):
+    """Fetch the city list, keyed on database mtimes; raises unless every source was read"""
+    cities, problems = read_cities()
+    if problems:
+        raise RuntimeError("; ".join(problems))
+    return cities
+
+def get_available_cities():
+    """Dynamically fetch list of cities from databases"""
+    mtimes = tuple(database_mtime(path) for path in (DB_CURRENT, DB_FORECAST, DB_METEOSTAT))
+    try:
+        cities = load_cities(mtimes)
+    except Exception:
+        # Partial results are not cached; read again and report each problem
+        cities, problems = read_cities()
+        for problem in problems:
+            st.warning(problem)
+    
+    return cities if cities else ["Nairobi", "Sydney", "New York", "London"]
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_current_weather(mtime, cities):
+    """Load current weather data for the given cities from database, indexed by city"""
+    # Most recent record for each city, served by idx_current_city_time.
+    # All columns are kept: Tab 4 shows the full row.
+    query = f"""
+    WITH latest AS (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY city ORDER BY created_at DESC, id DESC
+        ) AS rn
+        FROM current
+        WHERE city IN ({city_placeholders(cities)})
+    )
+    SELECT city, datetime, temp_c, humidity, wind_kph, wind_dir,
+           precip_mm, aqi, condition, created_at
+    FROM latest
+    WHERE rn = 1
+    """
+    df = read_sql(DB_CURRENT, query, params=cities, parse_dates=['created_at', 'datetime'])
+    return df.set_index('city')
 
-@st.cache_data(ttl=3600)
-def load_forecast_data():
-    """Load forecast data from database"""
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_forecast_data(mtime, cities):
+    """Load forecast data for the given cities from database"""
+    query = f"""
+    SELECT city, datetime, temp_c, humidity, precip_mm
+    FROM forecast
+    WHERE city IN ({city_placeholders(cities)})
+    ORDER BY datetime
+    """
+    df = read_sql(DB_FORECAST, query, params=cities, parse_dates=['datetime'])
+    return df.astype(FORECAST_DTYPES)
+
+@st.cache_resource(max_entries=1)
+def refresh_parquet(mtime):
+    """Export the meteostat table to Parquet, sorted by city, and return its path
+
+    Each export writes its own temporary file and swaps it in with os.replace.
+    """
+    # meteostat.date is DATE text; datetime() gives one form to parse
+    query = """
+    SELECT datetime(date) AS date, city, temperature, precipitation,
+           humidity, wind_speed
+    FROM meteostat
+    ORDER BY city, date
+    """
+    df = read_sql(
+        DB_METEOSTAT, query, parse_dates={'date': {'format': '%Y-%m-%d %H:%M:%S'}}
+    ).astype(METEOSTAT_DTYPES)
+    
+    with tempfile.NamedTemporaryFile(
+        dir=PARQUET_METEOSTAT.parent, suffix=".parquet.tmp", delete=False
+    ) as tmp:
+        tmp_path = tmp.name
     try:
-        conn = sqlite3.connect(DB_FORECAST)
-        query = """
-        SELECT city, datetime, temp_c, humidity, wind_kph, wind_dir,
-               precip_mm, aqi, condition
-        FROM forecast
-        ORDER BY datetime
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        return df
-    except Exception as e:
-        st.error(f"Error loading forecast data: {e}")
-        return pd.DataFrame()
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, row_group_size=50_000)
+        os.replace(tmp_path, PARQUET_METEOSTAT)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return PARQUET_METEOSTAT
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_meteostat_data(mtime, cities):
+    """Load historical meteostat data for the given cities from Parquet"""
+    # Rows come back grouped by city and ordered by date within each city
+    return pd.read_parquet(
+        refresh_parquet(mtime),
+        columns=METEOSTAT_COLUMNS,
+        filters=[('city', 'in', list(cities))]
+    )
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_hist_stats(mtime, cities):
+    """Aggregate historical statistics per city in SQLite, indexed by city"""
+    # TOTAL() rather than SUM() so an all-NULL column yields 0 like pandas
+    query = f"""
+    SELECT city,
+           AVG(temperature) AS avg_temp,
+           MAX(temperature) AS max_temp,
+           MIN(temperature) AS min_temp,
+           TOTAL(precipitation) AS total_precip,
+           AVG(humidity) AS avg_humidity,
+           AVG(wind_speed) AS avg_wind
+    FROM meteostat
+    WHERE city IN ({city_placeholders(cities)})
+    GROUP BY city
+    """
+    df = read_sql(DB_METEOSTAT, query, params=cities)
+    return df.set_index('city').astype(float)
 
-@st.cache_data(ttl=3600)
-def load_meteostat_data():
-    """Load historical meteostat data from database"""
+def loaded_frame(future, message):
+    """Return a loader's DataFrame, or show its error and return an empty one
+
+    Loaders raise rather than return empty frames, so st.cache_data only
+    keeps successful results and a failed load is retried on the next run.
+    """
     try:
-        conn = sqlite3.connect(DB_METEOSTAT)
-        query = """
-        SELECT date, city, temperature, precipitation, snow, 
-               wind_dir, wind_speed, humidity, cloud_cover, sunshine_duration
-        FROM meteostat
-        ORDER BY date
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        df['date'] = pd.to_datetime(df['date'])
-        return df
+        return future.result()
     except Exception as e:
-        st.error(f"Error loading historical data: {e}")
+        st.error(f"{message}: {e}")
         return pd.DataFrame()
 
+# Chart builders
+# Figures are cached on the database mtime and city pair, which fully
+# determine the loaded frames, so the frames themselves are passed as
+# underscore arguments that st.cache_data does not hash. Readings are
+# float32 in the cache but go into traces as float64, since Plotly
+# serialises float32 arrays as typed binary that not every renderer reads.
+
+# Historical charts are downsampled to roughly one point per pixel column
+HIST_MAX_POINTS = 1500
+
+def downsample_lttb(df, x_col, y_col, n_out=HIST_MAX_POINTS):
+    """Reduce a time series to n_out rows with Largest-Triangle-Three-Buckets
+
+    Keeps the first and last rows and, for each bucket in between, the row
+    forming the largest triangle with the previously kept row and the mean
+    of the next bucket, so peaks and troughs survive. Rows with a missing
+    y value are dropped before downsampling.
+    """
+    if len(df) <= n_out:
+        return df
+    
+    data = df.dropna(subset=[y_col])
+    n = len(data)
+    if n <= n_out:
+        return data
+    
+    x = data[x_col].to_numpy().astype(np.int64).astype(float)
+    y = data[y_col].to_numpy(dtype=float)
+    
+    # n_out - 2 buckets over the interior rows; first and last are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    edges = np.append(edges, n)
+    
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        avg_x = x[end:edges[i + 2]].mean()
+        avg_y = y[end:edges[i + 2]].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        idx[i + 1] = a
+    
+    return data.iloc[idx]
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_temp_forecast_fig(mtime, city1, city2, _city1_df, _city2_df):
+    """Build the forecast temperature line chart"""
+    fig_temp = go.Figure()
+    fig_temp.add_trace(go.Scattergl(
+        x=_city1_df['datetime'],
+        y=_city1_df['temp_c'].astype('float64'),
+        name=city1,
+        mode='lines+markers',
+        line=dict(color='#FF6B6B', width=3)
+    ))
+    fig_temp.add_trace(go.Scattergl(
+        x=_city2_df['datetime'],
+        y=_city2_df['temp_c'].astype('float64'),
+        name=city2,
+        mode='lines+markers',
+        line=dict(color='#4ECDC4', width=3)
+    ))
+    fig_temp.update_layout(
+        xaxis_title="Date/Time",
+        yaxis_title="Temperature (°C)",
+        hovermode='x unified',
+        height=400
+    )
+    return fig_temp
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_precip_forecast_fig(mtime, city1, city2, _city1_df, _city2_df):
+    """Build the forecast precipitation bar chart"""
+    fig_precip = px.bar(
+        pd.concat([_city1_df, _city2_df]).astype({'precip_mm': 'float64'}),
+        x='datetime',
+        y='precip_mm',
+        color='city',
+        barmode='group',
+        color_discrete_map={city1: '#FF6B6B', city2: '#4ECDC4'}
+    )
+    # Default bar hover (x, y and city name) instead of px's column-name labels
+    fig_precip.update_traces(hovertemplate=None)
+    fig_precip.update_layout(
+        xaxis_title="Date/Time",
+        yaxis_title="Precipitation (mm)",
+        legend_title_text=None,
+        height=350
+    )
+    return fig_precip
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_humidity_forecast_fig(mtime, city1, city2, _city1_df, _city2_df):
+    """Build the forecast humidity area chart"""
+    fig_humidity = go.Figure()
+    fig_humidity.add_trace(go.Scattergl(
+        x=_city1_df['datetime'],
+        y=_city1_df['humidity'].astype('float64'),
+        name=city1,
+        fill='tozeroy',
+        line=dict(color='#FF6B6B')
+    ))
+    fig_humidity.add_trace(go.Scattergl(
+        x=_city2_df['datetime'],
+        y=_city2_df['humidity'].astype('float64'),
+        name=city2,
+        fill='tozeroy',
+        line=dict(color='#4ECDC4')
+    ))
+    fig_humidity.update_layout(
+        xaxis_title="Date/Time",
+        yaxis_title="Humidity (%)",
+        height=350
+    )
+    return fig_humidity
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_hist_temp_fig(mtime, city1, city2, _city1_df, _city2_df):
+    """Build the downsampled historical temperature line chart"""
+    temp_city1 = downsample_lttb(_city1_df, 'date', 'temperature')
+    temp_city2 = downsample_lttb(_city2_df, 'date', 'temperature')
+    fig_hist_temp = go.Figure()
+    fig_hist_temp.add_trace(go.Scattergl(
+        x=temp_city1['date'],
+        y=temp_city1['temperature'].astype('float64'),
+        name=city1,
+        mode='lines',
+        line=dict(color='#FF6B6B', width=2)
+    ))
+    fig_hist_temp.add_trace(go.Scattergl(
+        x=temp_city2['date'],
+        y=temp_city2['temperature'].astype('float64'),
+        name=city2,
+        mode='lines',
+        line=dict(color='#4ECDC4', width=2)
+    ))
+    fig_hist_temp.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Temperature (°C)",
+        hovermode='x unified',
+        height=400
+    )
+    return fig_hist_temp
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_hist_precip_fig(mtime, city1, city2, _city1_df, _city2_df):
+    """Build the downsampled historical precipitation bar chart"""
+    precip_city1 = downsample_lttb(_city1_df, 'date', 'precipitation')
+    precip_city2 = downsample_lttb(_city2_df, 'date', 'precipitation')
+    fig_precip_hist = px.bar(
+        pd.concat([precip_city1, precip_city2]).astype({'precipitation': 'float64'}),
+        x='date',
+        y='precipitation',
+        color='city',
+        barmode='group',
+        color_discrete_map={city1: '#FF6B6B', city2: '#4ECDC4'}
+    )
+    fig_precip_hist.update_traces(hovertemplate=None)
+    fig_precip_hist.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Precipitation (mm)",
+        legend_title_text=None,
+        height=400
+    )
+    return fig_precip_hist
+
 # Main app
 def main():
     st.title("🌤️ Multi-City Weather Comparison Dashboard")
     st.markdown("---")
     
+    ensure_indexes()
+    
     # Dynamically get available cities from databases
     CITIES = get_available_cities()
     
@@ -130,11 +532,6 @@ def main():
     
     st.sidebar.success(f"✅ Found {len(CITIES)} cities in database")
     
-    # Load all data
-    current_df = load_current_weather()
-    forecast_df = load_forecast_data()
-    historical_df = load_meteostat_data()
-    
     # Sidebar for city selection
     st.sidebar.header("🌍 Select Cities to Compare")
     
@@ -150,6 +547,27 @@ def main():
     
     city2 = st.sidebar.selectbox("City 2", available_cities_for_city2, index=0, key="city2")
     
+    # Load data for the selected cities only; each loader opens its own
+    # connection and sqlite3 releases the GIL, so they run concurrently.
+    # Worker threads get the script context the cached loaders expect.
+    cities = (city1, city2)
+    current_mtime = database_mtime(DB_CURRENT)
+    forecast_mtime = database_mtime(DB_FORECAST)
+    meteostat_mtime = database_mtime(DB_METEOSTAT)
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=4,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    ) as executor:
+        current_future = executor.submit(load_current_weather, current_mtime, cities)
+        forecast_future = executor.submit(load_forecast_data, forecast_mtime, cities)
+        historical_future = executor.submit(load_meteostat_data, meteostat_mtime, cities)
+        stats_future = executor.submit(load_hist_stats, meteostat_mtime, cities)
+    current_df = loaded_frame(current_future, "Error loading current weather")
+    forecast_df = loaded_frame(forecast_future, "Error loading forecast data")
+    historical_df = loaded_frame(historical_future, "Error loading historical data")
+    hist_stats = loaded_frame(stats_future, "Error loading historical statistics")
+    
     # Tabs for different views
     tab1, tab2, tab3, tab4 = st.tabs([
         "📍 Current Weather", 
@@ -160,285 +578,194 @@ def main():
     
     # TAB 1: Current Weather Comparison
     with tab1:
-        st.header(f"Current Weather: {city1} vs {city2}")
-        
-        if not current_df.empty:
-            col1, col2 = st.columns(2)
-            
-            # City 1 Current Weather
-            with col1:
-                city1_data = current_df[current_df['city'] == city1]
-                if not city1_data.empty:
-                    display_current_weather_card(city1, city1_data.iloc[0])
-                else:
-                    st.warning(f"No current data for {city1}")
-            
-            # City 2 Current Weather
-            with col2:
-                city2_data = current_df[current_df['city'] == city2]
-                if not city2_data.empty:
-                    display_current_weather_card(city2, city2_data.iloc[0])
-                else:
-                    st.warning(f"No current data for {city2}")
-            
-            # Comparison metrics
-            st.markdown("---")
-            st.subheader("📊 Quick Comparison")
-            create_comparison_chart(city1, city2, current_df)
-        else:
-            st.warning("No current weather data available")
+        render_current_tab(city1, city2, current_df)
     
     # TAB 2: Forecast Comparison
     with tab2:
-        st.header(f"Weather Forecast: {city1} vs {city2}")
-        
-        if not forecast_df.empty:
-            # Filter forecast data for selected cities
-            forecast_city1 = forecast_df[forecast_df['city'] == city1].copy()
-            forecast_city2 = forecast_df[forecast_df['city'] == city2].copy()
-            
-            if not forecast_city1.empty and not forecast_city2.empty:
-                # Temperature forecast
-                st.subheader("🌡️ Temperature Forecast (Next 24 Hours)")
-                fig_temp = go.Figure()
-                fig_temp.add_trace(go.Scatter(
-                    x=forecast_city1['datetime'],
-                    y=forecast_city1['temp_c'],
-                    name=city1,
-                    mode='lines+markers',
-                    line=dict(color='#FF6B6B', width=3)
-                ))
-                fig_temp.add_trace(go.Scatter(
-                    x=forecast_city2['datetime'],
-                    y=forecast_city2['temp_c'],
-                    name=city2,
-                    mode='lines+markers',
-                    line=dict(color='#4ECDC4', width=3)
-                ))
-                fig_temp.update_layout(
-                    xaxis_title="Date/Time",
-                    yaxis_title="Temperature (°C)",
-                    hovermode='x unified',
-                    height=400
-                )
-                st.plotly_chart(fig_temp, use_container_width=True)
-                
-                # Precipitation and Humidity
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("🌧️ Precipitation Forecast")
-                    fig_precip = go.Figure()
-                    fig_precip.add_trace(go.Bar(
-                        x=forecast_city1['datetime'],
-                        y=forecast_city1['precip_mm'],
-                        name=city1,
-                        marker_color='#FF6B6B'
-                    ))
-                    fig_precip.add_trace(go.Bar(
-                        x=forecast_city2['datetime'],
-                        y=forecast_city2['precip_mm'],
-                        name=city2,
-                        marker_color='#4ECDC4'
-                    ))
-                    fig_precip.update_layout(
-                        xaxis_title="Date/Time",
-                        yaxis_title="Precipitation (mm)",
-                        height=350,
-                        barmode='group'
-                    )
-                    st.plotly_chart(fig_precip, use_container_width=True)
-                
-                with col2:
-                    st.subheader("💧 Humidity Forecast")
-                    fig_humidity = go.Figure()
-                    fig_humidity.add_trace(go.Scatter(
-                        x=forecast_city1['datetime'],
-                        y=forecast_city1['humidity'],
-                        name=city1,
-                        fill='tozeroy',
-                        line=dict(color='#FF6B6B')
-                    ))
-                    fig_humidity.add_trace(go.Scatter(
-                        x=forecast_city2['datetime'],
-                        y=forecast_city2['humidity'],
-                        name=city2,
-                        fill='tozeroy',
-                        line=dict(color='#4ECDC4')
-                    ))
-                    fig_humidity.update_layout(
-                        xaxis_title="Date/Time",
-                        yaxis_title="Humidity (%)",
-                        height=350
-                    )
-                    st.plotly_chart(fig_humidity, use_container_width=True)
-            else:
-                st.warning("Insufficient forecast data for comparison")
-        else:
-            st.warning("No forecast data available")
+        render_forecast_tab(city1, city2, forecast_df, forecast_mtime)
     
     # TAB 3: Historical Analysis
     with tab3:
-        st.header(f"Historical Weather Analysis: {city1} vs {city2}")
-        
-        if not historical_df.empty:
-            # Filter historical data
-            hist_city1 = historical_df[historical_df['city'] == city1].copy()
-            hist_city2 = historical_df[historical_df['city'] == city2].copy()
-            
-            if not hist_city1.empty and not hist_city2.empty:
-                # Calculate yearly averages
-                st.subheader("📅 2025 Year-to-Date Averages")
-                
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    avg_temp1 = hist_city1['temperature'].mean()
-                    avg_temp2 = hist_city2['temperature'].mean()
-                    st.metric(
-                        f"{city1} Avg Temp",
-                        f"{avg_temp1:.1f}°C"
-                    )
-                    st.metric(
-                        f"{city2} Avg Temp",
-                        f"{avg_temp2:.1f}°C",
-                        delta=f"{avg_temp2 - avg_temp1:.1f}°C"
-                    )
-                
-                with col2:
-                    avg_precip1 = hist_city1['precipitation'].sum()
-                    avg_precip2 = hist_city2['precipitation'].sum()
-                    st.metric(
-                        f"{city1} Total Precip",
-                        f"{avg_precip1:.0f}mm"
-                    )
-                    st.metric(
-                        f"{city2} Total Precip",
-                        f"{avg_precip2:.0f}mm",
-                        delta=f"{avg_precip2 - avg_precip1:.0f}mm"
-                    )
-                
-                with col3:
-                    avg_humidity1 = hist_city1['humidity'].mean()
-                    avg_humidity2 = hist_city2['humidity'].mean()
-                    st.metric(
-                        f"{city1} Avg Humidity",
-                        f"{avg_humidity1:.0f}%"
-                    )
-                    st.metric(
-                        f"{city2} Avg Humidity",
-                        f"{avg_humidity2:.0f}%",
-                        delta=f"{avg_humidity2 - avg_humidity1:.0f}%"
-                    )
-                
-                with col4:
-                    avg_wind1 = hist_city1['wind_speed'].mean()
-                    avg_wind2 = hist_city2['wind_speed'].mean()
-                    st.metric(
-                        f"{city1} Avg Wind",
-                        f"{avg_wind1:.1f}km/h"
-                    )
-                    st.metric(
-                        f"{city2} Avg Wind",
-                        f"{avg_wind2:.1f}km/h",
-                        delta=f"{avg_wind2 - avg_wind1:.1f}km/h"
-                    )
-                
-                # Temperature trend
-                st.subheader("🌡️ Temperature Trend (2025 YTD)")
-                fig_hist_temp = go.Figure()
-                fig_hist_temp.add_trace(go.Scatter(
-                    x=hist_city1['date'],
-                    y=hist_city1['temperature'],
-                    name=city1,
-                    mode='lines',
-                    line=dict(color='#FF6B6B', width=2)
-                ))
-                fig_hist_temp.add_trace(go.Scatter(
-                    x=hist_city2['date'],
-                    y=hist_city2['temperature'],
-                    name=city2,
-                    mode='lines',
-                    line=dict(color='#4ECDC4', width=2)
-                ))
-                fig_hist_temp.update_layout(
-                    xaxis_title="Date",
-                    yaxis_title="Temperature (°C)",
-                    hovermode='x unified',
-                    height=400
-                )
-                st.plotly_chart(fig_hist_temp, use_container_width=True)
-                
-                # Precipitation comparison
-                st.subheader("🌧️ Precipitation Comparison")
-                fig_precip_hist = go.Figure()
-                fig_precip_hist.add_trace(go.Bar(
-                    x=hist_city1['date'],
-                    y=hist_city1['precipitation'],
-                    name=city1,
-                    marker_color='#FF6B6B'
-                ))
-                fig_precip_hist.add_trace(go.Bar(
-                    x=hist_city2['date'],
-                    y=hist_city2['precipitation'],
-                    name=city2,
-                    marker_color='#4ECDC4'
-                ))
-                fig_precip_hist.update_layout(
-                    xaxis_title="Date",
-                    yaxis_title="Precipitation (mm)",
-                    barmode='group',
-                    height=400
-                )
-                st.plotly_chart(fig_precip_hist, use_container_width=True)
-            else:
-                st.warning("Insufficient historical data for comparison")
-        else:
-            st.warning("No historical data available")
+        render_historical_tab(city1, city2, historical_df, hist_stats, meteostat_mtime)
     
     # TAB 4: Detailed Metrics
     with tab4:
-        st.header("🔍 Detailed Metrics & Data Tables")
-        
-        # Show raw data tables
+        render_metrics_tab(city1, city2, current_df, hist_stats)
+
+def render_current_tab(city1, city2, current_df):
+    """Render the current weather comparison tab"""
+    st.header(f"Current Weather: {city1} vs {city2}")
+    
+    if not current_df.empty:
         col1, col2 = st.columns(2)
         
+        # City 1 Current Weather
         with col1:
-            st.subheader(f"📋 {city1} Current Weather")
-            if not current_df.empty:
-                city1_current = current_df[current_df['city'] == city1]
-                if not city1_current.empty:
-                    st.dataframe(city1_current, use_container_width=True)
+            if city1 in current_df.index:
+                display_current_weather_card(city1, current_df.loc[city1])
+            else:
+                st.warning(f"No current data for {city1}")
         
+        # City 2 Current Weather
         with col2:
-            st.subheader(f"📋 {city2} Current Weather")
-            if not current_df.empty:
-                city2_current = current_df[current_df['city'] == city2]
-                if not city2_current.empty:
-                    st.dataframe(city2_current, use_container_width=True)
+            if city2 in current_df.index:
+                display_current_weather_card(city2, current_df.loc[city2])
+            else:
+                st.warning(f"No current data for {city2}")
         
-        # Historical statistics
+        # Comparison metrics
         st.markdown("---")
-        st.subheader("📊 Historical Statistics Summary")
+        st.subheader("📊 Quick Comparison")
+        if city1 in current_df.index and city2 in current_df.index:
+            create_comparison_chart(city1, city2, current_df.loc[city1], current_df.loc[city2])
+    else:
+        st.warning("No current weather data available")
+
+def render_forecast_tab(city1, city2, forecast_df, forecast_mtime):
+    """Render the forecast comparison tab"""
+    st.header(f"Weather Forecast: {city1} vs {city2}")
+    
+    if not forecast_df.empty:
+        # Filter forecast data for selected cities
+        forecast_city1 = forecast_df[forecast_df['city'] == city1].copy()
+        forecast_city2 = forecast_df[forecast_df['city'] == city2].copy()
         
-        if not historical_df.empty:
-            summary_data = []
-            for city in [city1, city2]:
-                city_hist = historical_df[historical_df['city'] == city]
-                if not city_hist.empty:
-                    summary_data.append({
-                        'City': city,
-                        'Avg Temperature (°C)': f"{city_hist['temperature'].mean():.2f}",
-                        'Max Temperature (°C)': f"{city_hist['temperature'].max():.2f}",
-                        'Min Temperature (°C)': f"{city_hist['temperature'].min():.2f}",
-                        'Total Precipitation (mm)': f"{city_hist['precipitation'].sum():.2f}",
-                        'Avg Humidity (%)': f"{city_hist['humidity'].mean():.2f}",
-                        'Avg Wind Speed (km/h)': f"{city_hist['wind_speed'].mean():.2f}"
-                    })
+        if not forecast_city1.empty and not forecast_city2.empty:
+            # Temperature forecast
+            st.subheader("🌡️ Temperature Forecast (Next 24 Hours)")
+            fig_temp = build_temp_forecast_fig(forecast_mtime, city1, city2, forecast_city1, forecast_city2)
+            st.plotly_chart(fig_temp, use_container_width=True)
             
-            if summary_data:
-                summary_df = pd.DataFrame(summary_data)
-                st.dataframe(summary_df, use_container_width=True)
+            # Precipitation and Humidity
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader("🌧️ Precipitation Forecast")
+                fig_precip = build_precip_forecast_fig(forecast_mtime, city1, city2, forecast_city1, forecast_city2)
+                st.plotly_chart(fig_precip, use_container_width=True)
+            
+            with col2:
+                st.subheader("💧 Humidity Forecast")
+                fig_humidity = build_humidity_forecast_fig(forecast_mtime, city1, city2, forecast_city1, forecast_city2)
+                st.plotly_chart(fig_humidity, use_container_width=True)
+        else:
+            st.warning("Insufficient forecast data for comparison")
+    else:
+        st.warning("No forecast data available")
+
+def render_historical_tab(city1, city2, historical_df, hist_stats, meteostat_mtime):
+    """Render the historical analysis tab"""
+    st.header(f"Historical Weather Analysis: {city1} vs {city2}")
+    
+    if not historical_df.empty:
+        # Filter historical data
+        hist_city1 = historical_df[historical_df['city'] == city1].copy()
+        hist_city2 = historical_df[historical_df['city'] == city2].copy()
+        
+        if not hist_city1.empty and not hist_city2.empty and {city1, city2} <= set(hist_stats.index):
+            # Yearly averages, aggregated in SQL by load_hist_stats
+            st.subheader("📅 2025 Year-to-Date Averages")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                avg_temp1 = hist_stats.loc[city1, 'avg_temp']
+                avg_temp2 = hist_stats.loc[city2, 'avg_temp']
+                st.metric(
+                    f"{city1} Avg Temp",
+                    f"{avg_temp1:.1f}°C"
+                )
+                st.metric(
+                    f"{city2} Avg Temp",
+                    f"{avg_temp2:.1f}°C",
+                    delta=f"{avg_temp2 - avg_temp1:.1f}°C"
+                )
+            
+            with col2:
+                avg_precip1 = hist_stats.loc[city1, 'total_precip']
+                avg_precip2 = hist_stats.loc[city2, 'total_precip']
+                st.metric(
+                    f"{city1} Total Precip",
+                    f"{avg_precip1:.0f}mm"
+                )
+                st.metric(
+                    f"{city2} Total Precip",
+                    f"{avg_precip2:.0f}mm",
+                    delta=f"{avg_precip2 - avg_precip1:.0f}mm"
+                )
+            
+            with col3:
+                avg_humidity1 = hist_stats.loc[city1, 'avg_humidity']
+                avg_humidity2 = hist_stats.loc[city2, 'avg_humidity']
+                st.metric(
+                    f"{city1} Avg Humidity",
+                    f"{avg_humidity1:.0f}%"
+                )
+                st.metric(
+                    f"{city2} Avg Humidity",
+                    f"{avg_humidity2:.0f}%",
+                    delta=f"{avg_humidity2 - avg_humidity1:.0f}%"
+                )
+            
+            with col4:
+                avg_wind1 = hist_stats.loc[city1, 'avg_wind']
+                avg_wind2 = hist_stats.loc[city2, 'avg_wind']
+                st.metric(
+                    f"{city1} Avg Wind",
+                    f"{avg_wind1:.1f}km/h"
+                )
+                st.metric(
+                    f"{city2} Avg Wind",
+                    f"{avg_wind2:.1f}km/h",
+                    delta=f"{avg_wind2 - avg_wind1:.1f}km/h"
+                )
+            
+            # Temperature trend
+            st.subheader("🌡️ Temperature Trend (2025 YTD)")
+            fig_hist_temp = build_hist_temp_fig(meteostat_mtime, city1, city2, hist_city1, hist_city2)
+            st.plotly_chart(fig_hist_temp, use_container_width=True)
+            
+            # Precipitation comparison
+            st.subheader("🌧️ Precipitation Comparison")
+            fig_precip_hist = build_hist_precip_fig(meteostat_mtime, city1, city2, hist_city1, hist_city2)
+            st.plotly_chart(fig_precip_hist, use_container_width=True)
+        else:
+            st.warning("Insufficient historical data for comparison")
+    else:
+        st.warning("No historical data available")
+
+def render_metrics_tab(city1, city2, current_df, hist_stats):
+    """Render the detailed metrics tab"""
+    st.header("🔍 Detailed Metrics & Data Tables")
+    
+    # Show raw data tables
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader(f"📋 {city1} Current Weather")
+        if city1 in current_df.index:
+            st.dataframe(current_df.loc[[city1]], use_container_width=True)
+    
+    with col2:
+        st.subheader(f"📋 {city2} Current Weather")
+        if city2 in current_df.index:
+            st.dataframe(current_df.loc[[city2]], use_container_width=True)
+    
+    # Historical statistics
+    st.markdown("---")
+    st.subheader("📊 Historical Statistics Summary")
+    
+    # load_hist_stats already returns one aggregated row per city; only
+    # relabel it and let the Styler format the numbers for display
+    if not hist_stats.empty:
+        summary_df = hist_stats.loc[
+            [city for city in (city1, city2) if city in hist_stats.index],
+            list(SUMMARY_COLUMNS)
+        ].rename(columns=SUMMARY_COLUMNS).rename_axis('City').reset_index()
+        st.dataframe(
+            summary_df.style.format("{:.2f}", subset=list(SUMMARY_COLUMNS.values())),
+            use_container_width=True
+        )
 
 def display_current_weather_card(city, data):
     """Display a weather card for a city"""
@@ -460,43 +787,25 @@ def display_current_weather_card(city, data):
     
     st.caption(f"Last updated: {data['datetime']}")
 
-def create_comparison_chart(city1, city2, current_df):
-    """Create a radar chart comparing current conditions"""
-    city1_data = current_df[current_df['city'] == city1].iloc[0]
-    city2_data = current_df[current_df['city'] == city2].iloc[0]
-    
-    categories = ['Temperature', 'Humidity', 'Wind Speed', 'Precipitation', 'AQI']
-    
+def create_comparison_chart(city1, city2, city1_data, city2_data):
+    """Create a radar chart comparing current conditions of two city rows"""
     # Normalize values for radar chart (0-100 scale)
-    city1_values = [
-        city1_data['temp_c'] * 2,  # Scale temp
-        city1_data['humidity'],
-        city1_data['wind_kph'] * 2,  # Scale wind
-        city1_data['precip_mm'] * 10,  # Scale precip
-        city1_data['aqi']
-    ]
-    
-    city2_values = [
-        city2_data['temp_c'] * 2,
-        city2_data['humidity'],
-        city2_data['wind_kph'] * 2,
-        city2_data['precip_mm'] * 10,
-        city2_data['aqi']
-    ]
+    city1_values = city1_data[RADAR_COLUMNS].to_numpy(dtype=float) * RADAR_SCALE
+    city2_values = city2_data[RADAR_COLUMNS].to_numpy(dtype=float) * RADAR_SCALE
     
     fig = go.Figure()
     
     fig.add_trace(go.Scatterpolar(
-        r=city1_values,
-        theta=categories,
+        r=city1_values.tolist(),
+        theta=RADAR_CATEGORIES,
         fill='toself',
         name=city1,
         line_color='#FF6B6B'
     ))
     
     fig.add_trace(go.Scatterpolar(
-        r=city2_values,
-        theta=categories,
+        r=city2_values.tolist(),
+        theta=RADAR_CATEGORIES,
         fill='toself',
         name=city2,
         line_color='#4ECDC4'